@@ -1,10 +1,10 @@
 import streamlit as st
-import PyPDF2
+import threading
 from io import BytesIO
-import base64
-import pypdfium2
-import tempfile
-import os
+try:
+    import pybase64 as base64  # SIMD-accelerated, API-compatible with stdlib base64
+except ImportError:
+    import base64
 
 st.set_page_config(layout="wide")
 
@@ -20,45 +20,65 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def display_page_with_highlights(uploaded_file, page_number):
-    # Create a temporary file to store the PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_file_path = tmp_file.name
+# pdfium is not thread-safe, even across separate documents, and the cached document
+# below is shared by every session's script thread, so all pdfium calls hold this lock.
+# It comes from st.cache_resource because the script body re-runs on every rerun and
+# a plain module-level Lock would be a new object each time.
+@st.cache_resource(show_spinner=False)
+def _pdfium_lock():
+    return threading.Lock()
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _open_doc(pdf_bytes: bytes):
+    # Imported here so reruns that never open a PDF don't pay for loading pdfium
+    import pypdfium2
     
-    try:
-        # Open PDF with pypdfium2
-        pdf = pypdfium2.PdfDocument(tmp_file_path)
-        
-        # Get the page
-        page = pdf[page_number]
-        
-        # Render the page to a bitmap
-        bitmap = page.render(
-            scale=2,  # Higher scale for better quality
-            rotation=0,  # No rotation
-            crop=(0, 0, 0, 0),  # No cropping
-        )
-        
-        # Convert bitmap to PIL image
-        image = bitmap.to_pil()
-        
-        # Convert PIL image to bytes
-        img_byte_arr = BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        
-        # Convert to base64
-        base64_img = base64.b64encode(img_byte_arr).decode()
+    # Parse the PDF once per uploaded file so page flips skip the open+parse
+    with _pdfium_lock():
+        return pypdfium2.PdfDocument(pdf_bytes)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _render_jpeg_b64(pdf_bytes: bytes, page_number: int, zoom: int) -> str:
+    pdf = _open_doc(pdf_bytes)
+    
+    with _pdfium_lock():
+        # Load only the requested page
+        page = pdf.get_page(page_number)
         
-        # Create HTML for displaying the image
-        img_display = f'<img src="data:image/png;base64,{base64_img}" style="width: 100%; height: auto;">'
+        try:
+            # Render the page to an RGB bitmap (pdfium skips the alpha channel by default)
+            bitmap = page.render(
+                scale=zoom,  # Higher scale for better quality
+                rotation=0,  # No rotation
+                crop=(0, 0, 0, 0),  # No cropping
+            )
+        finally:
+            # Free the page now rather than keeping it alive on the cached document
+            page.close()
         
-        return img_display
+        try:
+            # Convert bitmap to PIL image, copied out of pdfium's buffer so the
+            # bitmap can be freed here under the lock rather than by the GC
+            image = bitmap.to_pil().copy()
+        finally:
+            bitmap.close()
+    
+    # Convert PIL image to bytes (JPEG is much cheaper to encode than PNG for a preview)
+    img_byte_arr = BytesIO()
+    image.save(img_byte_arr, format='JPEG', quality=80)
+    img_byte_arr = img_byte_arr.getvalue()
     
-    finally:
-        # Clean up temporary file
-        os.unlink(tmp_file_path)
+    # Convert to base64
+    return base64.b64encode(img_byte_arr).decode('ascii')
+
+def display_page_with_highlights(pdf_bytes, page_number):
+    # Rendering is cached on (file contents, page, zoom) so unrelated reruns are free
+    base64_img = _render_jpeg_b64(pdf_bytes, page_number, 2)
+    
+    # Create HTML for displaying the image
+    img_display = f'<img src="data:image/jpeg;base64,{base64_img}" style="width: 100%; height: auto;">'
+    
+    return img_display
 
 def main():
     st.title("PDF Evaluator")
@@ -70,17 +90,28 @@ def main():
     # File uploader
     uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
 
-    if 'uploaded_file' in st.session_state and uploaded_file is not None and st.session_state.uploaded_file != uploaded_file.name:
+    # Per-session cache of the current file's page count and rendered pages, so reruns
+    # triggered by unrelated widgets don't even hash the PDF bytes
+    page_cache = st.session_state.setdefault('_page_cache', {})
+
+    # Track the upload by file_id rather than name, so re-uploading a different PDF
+    # under the same name still resets the page and the cached page count and image
+    if 'uploaded_file' in st.session_state and uploaded_file is not None and st.session_state.uploaded_file != uploaded_file.file_id:
         st.session_state.page_number = 0
+        page_cache.clear()
+        st.session_state.pop('_total_pages', None)
 
     if uploaded_file is not None:
-        st.session_state.uploaded_file = uploaded_file.name
+        st.session_state.uploaded_file = uploaded_file.file_id
     
     if uploaded_file is not None:
         # Read PDF file
-        pdf_bytes = BytesIO(uploaded_file.read())
-        pdf_reader = PyPDF2.PdfReader(pdf_bytes)
-        total_pages = len(pdf_reader.pages)
+        pdf_bytes = uploaded_file.getvalue()
+        if '_total_pages' not in st.session_state:
+            pdf = _open_doc(pdf_bytes)
+            with _pdfium_lock():
+                st.session_state._total_pages = len(pdf)
+        total_pages = st.session_state._total_pages
         
         # Create two columns
         col1, col2 = st.columns(2)
@@ -89,7 +120,12 @@ def main():
             current_page = st.session_state.page_number
             
             # Display current page with highlights
-            page_display = display_page_with_highlights(uploaded_file, current_page)
+            page_key = (uploaded_file.file_id, current_page)
+            if page_key not in page_cache:
+                # Only the displayed page is kept per session; other pages stay in st.cache_data
+                page_cache.clear()
+                page_cache[page_key] = display_page_with_highlights(pdf_bytes, current_page)
+            page_display = page_cache[page_key]
             st.markdown(page_display, unsafe_allow_html=True)
             
             # Add some spacing
@@ -134,33 +170,38 @@ def main():
             tab1, tab2 = st.tabs(["Checks", "Chat"])
             
             with tab1:
-                # Create nested tabs for different check categories
-                check_tab1, check_tab2, check_tab3, check_tab4 = st.tabs(["Document Structure", "Content Quality", "Visual Elements", "Formatting"])
-
-                # Add accordion sections with checklists
-                with check_tab1:
-                    st.checkbox("Title page present")
-                    st.checkbox("Table of contents included") 
-                    st.checkbox("Page numbers consistent")
-                    st.checkbox("Headers and footers consistent")
-
-                with check_tab2:
-                    st.checkbox("No spelling errors")
-                    st.checkbox("Grammar is correct")
-                    st.checkbox("Citations properly formatted")
-                    st.checkbox("References complete")
-
-                with check_tab3:
-                    st.checkbox("Images are clear")
-                    st.checkbox("Tables properly formatted")
-                    st.checkbox("Figures numbered correctly")
-                    st.checkbox("Captions present")
-
-                with check_tab4:
-                    st.checkbox("Font consistent")
-                    st.checkbox("Margins correct")
-                    st.checkbox("Line spacing uniform")
-                    st.checkbox("Paragraph alignment consistent")
+                # Batch the checklist in a form so ticking a box doesn't rerun the script
+                # (and re-render the PDF preview); state is applied once on submit
+                with st.form("checks_form"):
+                    # Create nested tabs for different check categories
+                    check_tab1, check_tab2, check_tab3, check_tab4 = st.tabs(["Document Structure", "Content Quality", "Visual Elements", "Formatting"])
+
+                    # Add accordion sections with checklists
+                    with check_tab1:
+                        st.checkbox("Title page present")
+                        st.checkbox("Table of contents included") 
+                        st.checkbox("Page numbers consistent")
+                        st.checkbox("Headers and footers consistent")
+
+                    with check_tab2:
+                        st.checkbox("No spelling errors")
+                        st.checkbox("Grammar is correct")
+                        st.checkbox("Citations properly formatted")
+                        st.checkbox("References complete")
+
+                    with check_tab3:
+                        st.checkbox("Images are clear")
+                        st.checkbox("Tables properly formatted")
+                        st.checkbox("Figures numbered correctly")
+                        st.checkbox("Captions present")
+
+                    with check_tab4:
+                        st.checkbox("Font consistent")
+                        st.checkbox("Margins correct")
+                        st.checkbox("Line spacing uniform")
+                        st.checkbox("Paragraph alignment consistent")
+
+                    st.form_submit_button("Save checks")
             
             with tab2:
                 # Initialize chat history in session state if it doesn't exist
@@ -1,23 +1,41 @@
 # write code to extract pdf pages in high resolution image and save it as a base64 string
 
-import PyPDF2
 import io
-import base64
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 import pypdfium2
 
+# Document handle for the current worker process, opened once by _init_worker
+_worker_pdf = None
+
+def _init_worker(pdf_path):
+    global _worker_pdf
+    _worker_pdf = pypdfium2.PdfDocument(pdf_path)
+
+def _render_page_b64(page_index):
+    page = _worker_pdf[page_index]
+    bitmap = page.render(scale=2.0)  # Scale 2.0 gives good resolution
+    image = bitmap.to_pil()
+
+    # Encode the page in memory rather than round-tripping through a file on disk
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
 def pdf_to_base64(pdf_path):
-    with open(pdf_path, "rb") as pdf_file:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        for page in pdf_reader.pages:
-            # Convert page to image using pypdfium2 instead since PyPDF2 doesn't have image conversion
-            pdf = pypdfium2.PdfDocument(pdf_path)
-            page_obj = pdf[page.page_number]
-            bitmap = page_obj.render(scale=2.0)  # Scale 2.0 gives good resolution
-            image = bitmap.to_pil()
-            image.save("page.png")
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    page_count = len(pdf)
+    pdf.close()
 
-    with open("page.png", "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+    # pdfium is not thread-safe, so pages are rendered in worker processes
+    # that each hold their own copy of the document
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(pdf_path,)) as executor:
+        return list(executor.map(_render_page_b64, range(page_count)))
 
 
-print(pdf_to_base64("test.pdf"))
+if __name__ == "__main__":
+    for page_base64 in pdf_to_base64("test.pdf"):
+        print(page_base64)
@@ -1,24 +1,39 @@
+import os
 import pdfplumber
-import json
-from typing import List, Dict, Any
+import orjson
+import numpy as np
+from typing import List, Dict, Any, Iterator
 import re
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Common title patterns, fused into one alternation so each check is a single match
+_TITLE_PATTERN = re.compile(
+    r'^(?:'
+    r'[A-Z][A-Z\s]+$'  # All caps
+    r'|\d+\.\s+[A-Z]'  # Numbered headings
+    r'|[A-Z][a-z]+(?:\s[A-Z][a-z]+)*$'  # Title case
+    r')'
+)
+
+# Common footnote patterns
+_FOOTNOTE_PATTERNS = [
+    re.compile(r'\[\d+\].*?(?=\n|$)', re.MULTILINE),  # [1] style
+    re.compile(r'\(\d+\].*?(?=\n|$)', re.MULTILINE),  # (1) style
+    re.compile(r'^\d+\.\s.*?(?=\n|$)', re.MULTILINE)  # 1. style
+]
 
 class PDFParser:
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
         self.document_name = pdf_path.split('/')[-1]
         self.elements = []
+        self.parsed = False
         
     def _is_title(self, text: str) -> bool:
         """Check if text is likely a title based on formatting and content."""
-        # Check for common title patterns
-        title_patterns = [
-            r'^[A-Z][A-Z\s]+$',  # All caps
-            r'^\d+\.\s+[A-Z]',   # Numbered headings
-            r'^[A-Z][a-z]+(\s[A-Z][a-z]+)*$'  # Title case
-        ]
-        return any(re.match(pattern, text.strip()) for pattern in title_patterns)
+        return _TITLE_PATTERN.match(text.strip()) is not None
     
     def _extract_metadata(self, pdf) -> Dict[str, Any]:
         """Extract metadata from PDF."""
@@ -32,38 +47,35 @@ class PDFParser:
         }
         return metadata
     
-    def _extract_footnotes(self, text: str, page_number: int, page) -> List[Dict[str, Any]]:
+    def _extract_footnotes(self, text: str, page_number: int, word_boxes: np.ndarray, word_texts: np.ndarray) -> List[Dict[str, Any]]:
         """Extract footnotes from text with bounding boxes."""
         footnotes = []
-        # Common footnote patterns
-        footnote_patterns = [
-            r'\[\d+\].*?(?=\n|$)',  # [1] style
-            r'\(\d+\].*?(?=\n|$)',  # (1) style
-            r'^\d+\.\s.*?(?=\n|$)'  # 1. style
-        ]
         
-        words = page.extract_words()
         all_footnote_texts = []
-        all_footnote_words = []
+        all_footnote_mask = np.zeros(len(word_texts), dtype=bool)
         
-        for pattern in footnote_patterns:
-            matches = re.finditer(pattern, text, re.MULTILINE)
+        # Bind hot lookups to locals for the match loop
+        doc_name = self.document_name
+        isin = np.isin
+        append_text = all_footnote_texts.append
+        
+        for pattern in _FOOTNOTE_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 footnote_text = match.group(0).strip()
-                footnote_words = [w for w in words if w['text'] in footnote_text]
-                if footnote_words:
-                    all_footnote_texts.append(footnote_text)
-                    all_footnote_words.extend(footnote_words)
+                footnote_tokens = set(footnote_text.split())
+                footnote_mask = isin(word_texts, list(footnote_tokens))
+                if footnote_mask.any():
+                    append_text(footnote_text)
+                    all_footnote_mask |= footnote_mask
         
-        if all_footnote_words:
+        if all_footnote_mask.any():
             # Calculate combined footnote bounding box
-            x0 = min(w['x0'] for w in all_footnote_words)
-            y0 = min(w['top'] for w in all_footnote_words)
-            x1 = max(w['x1'] for w in all_footnote_words)
-            y1 = max(w['bottom'] for w in all_footnote_words)
+            x0, y0 = word_boxes[all_footnote_mask, :2].min(axis=0).tolist()
+            x1, y1 = word_boxes[all_footnote_mask, 2:].max(axis=0).tolist()
             
             footnote = {
-                'document_name': self.document_name,
+                'document_name': doc_name,
                 'section_name': 'Footnotes',
                 'element_type': 'footnote',
                 'content': '\n'.join(all_footnote_texts),
@@ -87,6 +99,11 @@ class PDFParser:
         """Extract tables from page and convert to plain text format with bounding boxes."""
         tables = []
         
+        # Bind hot lookups to locals for the per-table loop
+        doc_name = self.document_name
+        page_number = page.page_number
+        append = tables.append
+        
         # Enhanced table detection settings
         table_settings = {
             "vertical_strategy": "text",  # Use text-based strategy
@@ -143,7 +160,7 @@ class PDFParser:
                         text_content = '\n'.join(text_rows)
                         
                         table_data = {
-                            'document_name': self.document_name,
+                            'document_name': doc_name,
                             'section_name': f'Table {table_idx + 1}',
                             'element_type': 'table',
                             'content': text_content,
@@ -159,47 +176,51 @@ class PDFParser:
                                     'y1': table_bbox.bbox[3]
                                 }
                             },
-                            'page_number': page.page_number
+                            'page_number': page_number
                         }
-                        tables.append(table_data)
+                        append(table_data)
         
         except Exception as e:
             print(f"Error extracting tables: {str(e)}")
         
         return tables
     
-    def _extract_paragraphs(self, text: str, page_number: int, page) -> List[Dict[str, Any]]:
+    def _extract_paragraphs(self, text: str, page_number: int, word_boxes: np.ndarray, word_texts: np.ndarray) -> List[Dict[str, Any]]:
         """Extract paragraphs from text with bounding boxes."""
         paragraphs = []
         current_section = "Introduction"  # Default section name
         
+        # Bind hot lookups to locals for the per-paragraph loop
+        doc_name = self.document_name
+        is_title = self._is_title
+        isin = np.isin
+        append = paragraphs.append
+        
         # Split text into paragraphs (assuming paragraphs are separated by double newlines)
         raw_paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
         
         for para in raw_paragraphs:
-            if self._is_title(para):
+            if is_title(para):
                 current_section = para
                 continue
                 
-            # Get words and their bounding boxes
-            words = page.extract_words()
-            para_words = [w for w in words if w['text'] in para]
+            # Get the paragraph's words and their bounding boxes
+            para_words = para.split()
+            para_mask = isin(word_texts, list(set(para_words)))
             
-            if para_words:
+            if para_mask.any():
                 # Calculate paragraph bounding box
-                x0 = min(w['x0'] for w in para_words)
-                y0 = min(w['top'] for w in para_words)
-                x1 = max(w['x1'] for w in para_words)
-                y1 = max(w['bottom'] for w in para_words)
+                x0, y0 = word_boxes[para_mask, :2].min(axis=0).tolist()
+                x1, y1 = word_boxes[para_mask, 2:].max(axis=0).tolist()
                 
                 paragraph_data = {
-                    'document_name': self.document_name,
+                    'document_name': doc_name,
                     'section_name': current_section,
                     'element_type': 'paragraph',
                     'content': para,
                     'metadata': {
                         'length': len(para),
-                        'word_count': len(para.split()),
+                        'word_count': len(para_words),
                         'bounding_box': {
                             'x0': x0,
                             'y0': y0,
@@ -209,36 +230,108 @@ class PDFParser:
                     },
                     'page_number': page_number
                 }
-                paragraphs.append(paragraph_data)
+                append(paragraph_data)
         
         return paragraphs
     
-    def parse(self) -> List[Dict[str, Any]]:
-        """Parse the PDF and return structured elements."""
+    def _parse_page(self, page) -> List[Dict[str, Any]]:
+        """Extract paragraphs, tables and footnotes from a single page."""
+        # Extract text
+        text = page.extract_text() or ""
+        
+        # Extract words once per page into arrays of (x0, top, x1, bottom) boxes and texts
+        words = page.extract_words()
+        word_boxes = np.array(
+            [(w['x0'], w['top'], w['x1'], w['bottom']) for w in words], dtype=np.float64
+        ).reshape(-1, 4)
+        word_texts = np.array([w['text'] for w in words], dtype=str)
+        
+        # Extract elements
+        paragraphs = self._extract_paragraphs(text, page.page_number, word_boxes, word_texts)
+        tables = self._extract_tables(page)
+        footnotes = self._extract_footnotes(text, page.page_number, word_boxes, word_texts)
+        
+        return paragraphs + tables + footnotes
+    
+    def iter_elements(self) -> Iterator[Dict[str, Any]]:
+        """Parse the PDF and yield structured elements one page at a time."""
         with pdfplumber.open(self.pdf_path) as pdf:
             # Extract document metadata
             metadata = self._extract_metadata(pdf)
+            total_pages = metadata['total_pages']
+            max_workers = min(os.cpu_count() or 1, total_pages)
             
-            for page in pdf.pages:
-                # Extract text
-                text = page.extract_text() or ""
-                
-                # Extract elements
-                paragraphs = self._extract_paragraphs(text, page.page_number, page)
-                tables = self._extract_tables(page)
-                footnotes = self._extract_footnotes(text, page.page_number, page)
-                
-                # Add all elements to the list
-                self.elements.extend(paragraphs)
-                self.elements.extend(tables)
-                self.elements.extend(footnotes)
+            # Worker processes each open the whole PDF, which isn't worth it for one page
+            if max_workers <= 1:
+                for page in pdf.pages:
+                    yield from self._parse_page(page)
+                    page.flush_cache()
+                return
         
+        # Pages are independent and pdfplumber's work is pure Python, so parse them in
+        # worker processes. Workers get this parser's class and state (minus any
+        # collected elements) so subclasses and changed attributes carry over.
+        parser_state = {key: value for key, value in vars(self).items() if key != 'elements'}
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(type(self), parser_state)
+        ) as executor:
+            # Keep only a bounded window of pages in flight and yield them in page
+            # order, so memory stays bounded however long the document is
+            pending = deque()
+            next_page = 0
+            while pending or next_page < total_pages:
+                while next_page < total_pages and len(pending) < 2 * max_workers:
+                    pending.append(executor.submit(_parse_page_in_worker, next_page))
+                    next_page += 1
+                yield from pending.popleft().result()
+    
+    def parse(self) -> List[Dict[str, Any]]:
+        """Parse the PDF and return structured elements."""
+        self.elements.extend(self.iter_elements())
+        self.parsed = True
         return self.elements
     
     def save_to_json(self, output_path: str):
-        """Save parsed elements to JSON file."""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.elements, f, indent=2, ensure_ascii=False)
+        """Save parsed elements to JSON file.
+        
+        If the PDF has not been parsed yet, elements are streamed to the file
+        as each page is parsed instead of being collected in memory first.
+        The output is a 2-space indented JSON array; values, including float
+        formatting, are serialised by orjson.
+        """
+        elements = self.elements if self.parsed else self.iter_elements()
+        with open(output_path, 'wb') as f:
+            # Write the array one element at a time; orjson writes UTF-8 bytes directly
+            f.write(b'[')
+            is_empty = True
+            for element in elements:
+                f.write(b'\n  ' if is_empty else b',\n  ')
+                f.write(orjson.dumps(element, option=orjson.OPT_INDENT_2).replace(b'\n', b'\n  '))
+                is_empty = False
+            f.write(b']' if is_empty else b'\n]')
+
+# Parser and open PDF for the current worker process, set up once by _init_worker.
+# pdfplumber objects can't be pickled, so each worker opens its own copy of the file.
+_worker_parser = None
+_worker_pdf = None
+
+def _init_worker(parser_cls: type, parser_state: Dict[str, Any]):
+    global _worker_parser, _worker_pdf
+    # Rebuild the parent's parser without calling __init__, whose signature a subclass may change
+    _worker_parser = parser_cls.__new__(parser_cls)
+    _worker_parser.__dict__.update(parser_state)
+    _worker_parser.elements = []
+    _worker_pdf = pdfplumber.open(_worker_parser.pdf_path)
+
+def _parse_page_in_worker(page_index: int) -> List[Dict[str, Any]]:
+    page = _worker_pdf.pages[page_index]
+    elements = _worker_parser._parse_page(page)
+    
+    # Drop the page's cached layout objects so worker memory stays bounded
+    page.flush_cache()
+    return elements
 
 def main():
     # Example usage
@@ -246,7 +339,6 @@ def main():
     output_path = "/Users/ragmeister/Desktop/parsed_elements.json"
     
     parser = PDFParser(pdf_path)
-    elements = parser.parse()
     parser.save_to_json(output_path)
     print(f"PDF parsed successfully. Results saved to {output_path}")
 
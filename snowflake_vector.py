@@ -3,15 +3,15 @@
 # to perform similarity searches on vector embeddings.
 
 import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain.vectorstores import SnowflakeVector
 from langchain_core.runnables import RunnablePassthrough
-from langchain_openai import OpenAIEmbeddings
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_openai_functions_agent
 from langchain.agents import AgentExecutor
-from langchain.tools import tool
+from langchain.tools import StructuredTool
 
 # Environment setup (replace with your actual credentials)
 os.environ["OPENAI_API_KEY"] = "your-openai-api-key"
@@ -30,28 +30,38 @@ snowflake_connection_params = {
     "schema": os.environ.get("SNOWFLAKE_SCHEMA"),
 }
 
+# The OpenAI and vector store integrations are imported and built on first use,
+# so starting the CLI doesn't pay for them until a query is actually issued
+
 # Initialize the embedding model
-embeddings = OpenAIEmbeddings()
+@functools.lru_cache(maxsize=None)
+def _get_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
 
 # Initialize the Snowflake vector store (adjust table parameters as needed)
-vector_store = SnowflakeVector(
-    connection_params=snowflake_connection_params,
-    embedding=embeddings,
-    table_name="YOUR_VECTOR_TABLE",  # Replace with your vector table name
-    content_column="DOCUMENT_CONTENT",  # Column containing the text/document content
-    embedding_column="EMBEDDINGS",  # Column containing the vector embeddings
-    metadata_columns=["METADATA_COL1", "METADATA_COL2"]  # Optional metadata columns
-)
+@functools.lru_cache(maxsize=None)
+def _get_vector_store():
+    from langchain.vectorstores import SnowflakeVector
 
-# Create tools for our agent
-@tool
-def similarity_search(query: str, k: int = 5):
-    """
-    Perform a similarity search on the Snowflake vector table.
-    query: The text to search for similar documents
-    k: Number of results to return (default: 5)
-    """
-    results = vector_store.similarity_search(query, k=k)
+    return SnowflakeVector(
+        connection_params=snowflake_connection_params,
+        embedding=_get_embeddings(),
+        table_name="YOUR_VECTOR_TABLE",  # Replace with your vector table name
+        content_column="DOCUMENT_CONTENT",  # Column containing the text/document content
+        embedding_column="EMBEDDINGS",  # Column containing the vector embeddings
+        metadata_columns=["METADATA_COL1", "METADATA_COL2"]  # Optional metadata columns
+    )
+
+# Memoize query embeddings; agents frequently repeat the same search string
+@functools.lru_cache(maxsize=1024)
+def _embed_query(query: str):
+    return tuple(_get_embeddings().embed_query(query))
+
+async def _aembed_query(query: str):
+    return list(await asyncio.to_thread(_embed_query, query))
+
+def _format_results(results):
     formatted_results = []
     
     for i, doc in enumerate(results):
@@ -63,14 +73,7 @@ def similarity_search(query: str, k: int = 5):
     
     return "\n".join(formatted_results)
 
-@tool
-def similarity_search_with_score(query: str, k: int = 5):
-    """
-    Perform a similarity search on the Snowflake vector table with relevance scores.
-    query: The text to search for similar documents
-    k: Number of results to return (default: 5)
-    """
-    results = vector_store.similarity_search_with_score(query, k=k)
+def _format_scored_results(results):
     formatted_results = []
     
     for i, (doc, score) in enumerate(results):
@@ -82,8 +85,63 @@ def similarity_search_with_score(query: str, k: int = 5):
     
     return "\n".join(formatted_results)
 
-@tool
-def mmr_search(query: str, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5):
+def _scored_search(query, embedding, k):
+    vector_store = _get_vector_store()
+
+    # The scored by-vector search isn't part of the VectorStore interface, so use it
+    # only when the store provides it; otherwise fall back to the standard scored
+    # search, which embeds the query itself
+    search_by_vector = getattr(vector_store, "similarity_search_with_score_by_vector", None)
+    if search_by_vector is None:
+        return vector_store.similarity_search_with_score(query, k=k)
+    return search_by_vector(embedding, k=k)
+
+async def _ascored_search(query, embedding, k):
+    return await asyncio.to_thread(_scored_search, query, embedding, k)
+
+# Create tools for our agent. Each tool has a sync implementation, used by invoke(),
+# and an async one, used by ainvoke(); the sync function's docstring is the description.
+def _similarity_search(query: str, k: int = 5):
+    """
+    Perform a similarity search on the Snowflake vector table.
+    query: The text to search for similar documents
+    k: Number of results to return (default: 5)
+    """
+    embedding = list(_embed_query(query))
+    results = _get_vector_store().similarity_search_by_vector(embedding, k=k)
+    return _format_results(results)
+
+async def _asimilarity_search(query: str, k: int = 5):
+    embedding = await _aembed_query(query)
+    results = await _get_vector_store().asimilarity_search_by_vector(embedding, k=k)
+    return _format_results(results)
+
+similarity_search = StructuredTool.from_function(
+    func=_similarity_search, coroutine=_asimilarity_search, name="similarity_search"
+)
+
+def _similarity_search_with_score(query: str, k: int = 5):
+    """
+    Perform a similarity search on the Snowflake vector table with relevance scores.
+    query: The text to search for similar documents
+    k: Number of results to return (default: 5)
+    """
+    embedding = list(_embed_query(query))
+    results = _scored_search(query, embedding, k)
+    return _format_scored_results(results)
+
+async def _asimilarity_search_with_score(query: str, k: int = 5):
+    embedding = await _aembed_query(query)
+    results = await _ascored_search(query, embedding, k)
+    return _format_scored_results(results)
+
+similarity_search_with_score = StructuredTool.from_function(
+    func=_similarity_search_with_score,
+    coroutine=_asimilarity_search_with_score,
+    name="similarity_search_with_score"
+)
+
+def _mmr_search(query: str, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5):
     """
     Perform a Maximum Marginal Relevance (MMR) search on the Snowflake vector table.
     This balances relevance with diversity in results.
@@ -93,25 +151,69 @@ def mmr_search(query: str, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0
     fetch_k: Number of initial results to fetch before reranking (default: 20)
     lambda_mult: Diversity factor, 0-1 (0 = max diversity, 1 = max relevance, default: 0.5)
     """
-    results = vector_store.max_marginal_relevance_search(
-        query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+    embedding = list(_embed_query(query))
+    results = _get_vector_store().max_marginal_relevance_search_by_vector(
+        embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
     )
-    formatted_results = []
+    return _format_results(results)
+
+async def _ammr_search(query: str, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5):
+    embedding = await _aembed_query(query)
+    results = await _get_vector_store().amax_marginal_relevance_search_by_vector(
+        embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+    )
+    return _format_results(results)
+
+mmr_search = StructuredTool.from_function(
+    func=_mmr_search, coroutine=_ammr_search, name="mmr_search"
+)
+
+def _format_scored_and_mmr_results(scored_results, mmr_results):
+    return (
+        "Scored results:\n" + _format_scored_results(scored_results)
+        + "\nMMR results:\n" + _format_results(mmr_results)
+    )
+
+def _scored_and_mmr_search(query: str, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5):
+    """
+    Perform a similarity search with relevance scores and a Maximum Marginal Relevance (MMR)
+    search on the Snowflake vector table at the same time. Use this instead of calling
+    similarity_search_with_score and mmr_search one after the other.
     
-    for i, doc in enumerate(results):
-        formatted_results.append(
-            f"Result {i+1}:\n"
-            f"Content: {doc.page_content}\n"
-            f"Metadata: {doc.metadata}\n"
+    query: The text to search for similar documents
+    k: Number of results to return from each search (default: 5)
+    fetch_k: Number of initial results to fetch before MMR reranking (default: 20)
+    lambda_mult: Diversity factor, 0-1 (0 = max diversity, 1 = max relevance, default: 0.5)
+    """
+    # Embed once and run both queries concurrently
+    embedding = list(_embed_query(query))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        scored_future = executor.submit(_scored_search, query, embedding, k)
+        mmr_future = executor.submit(
+            _get_vector_store().max_marginal_relevance_search_by_vector,
+            embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
         )
-    
-    return "\n".join(formatted_results)
+        return _format_scored_and_mmr_results(scored_future.result(), mmr_future.result())
 
-# Define the tools our agent will use
-tools = [similarity_search, similarity_search_with_score, mmr_search]
+async def _ascored_and_mmr_search(query: str, k: int = 5, fetch_k: int = 20, lambda_mult: float = 0.5):
+    # Embed once and run both queries concurrently
+    embedding = await _aembed_query(query)
+    scored_results, mmr_results = await asyncio.gather(
+        _ascored_search(query, embedding, k),
+        _get_vector_store().amax_marginal_relevance_search_by_vector(
+            embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        ),
+    )
+    return _format_scored_and_mmr_results(scored_results, mmr_results)
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4")
+scored_and_mmr_search = StructuredTool.from_function(
+    func=_scored_and_mmr_search,
+    coroutine=_ascored_and_mmr_search,
+    name="scored_and_mmr_search"
+)
+
+# Define the tools our agent will use
+tools = [similarity_search, similarity_search_with_score, mmr_search, scored_and_mmr_search]
 
 # Define the agent prompt
 prompt = ChatPromptTemplate.from_messages([
@@ -126,15 +228,28 @@ prompt = ChatPromptTemplate.from_messages([
 ])
 
 # Create the agent
-agent = create_openai_functions_agent(llm, tools, prompt)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+@functools.lru_cache(maxsize=None)
+def _get_agent_executor():
+    from langchain_openai import ChatOpenAI
+
+    # Initialize the LLM
+    llm = ChatOpenAI(model="gpt-4")
+
+    agent = create_openai_functions_agent(llm, tools, prompt)
+    return AgentExecutor(agent=agent, tools=tools, verbose=True)
 
 # Example usage function
 def run_rag_agent(query):
     """
     Function to run the RAG agent with a user query
     """
-    return agent_executor.invoke({"input": query})
+    return _get_agent_executor().invoke({"input": query})
+
+async def arun_rag_agent(query):
+    """
+    Async version of run_rag_agent, for callers that already run an event loop
+    """
+    return await _get_agent_executor().ainvoke({"input": query})
 
 # Example usage - uncomment to test
 # query = "Find documents similar to 'machine learning for natural language processing'"